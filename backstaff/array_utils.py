@@ -64,7 +64,7 @@ class CompactArrayMask:
                 indices.append(axis_indices[i])
             mesh_indices = list(map(np.ravel, np.meshgrid(*indices, indexing="ij")))
             mesh_indices.insert(
-                axis, np.zeros(np.product(self.shape_except_axis(axis)), dtype=int)
+                axis, np.zeros(np.prod(self.shape_except_axis(axis)), dtype=int)
             )
             split_multi_indices.append(mesh_indices)
 
@@ -283,3 +283,21 @@ def sum_nondiagonal_elements_in_matrix(matrix):
             row_sums[i] += matrix[i, j]
             col_sums[i] += matrix[j, i]
     return col_sums, row_sums
+
+
+def nanminmax(values):
+    min_value, max_value = _nanminmax(np.ravel(np.asarray(values)))
+    return (np.nan, np.nan) if min_value > max_value else (min_value, max_value)
+
+
+@njit
+def _nanminmax(values):
+    min_value = np.inf
+    max_value = -np.inf
+    for i in range(values.size):
+        # Comparisons with NaN are false, so NaNs are skipped
+        if values[i] < min_value:
+            min_value = values[i]
+        if values[i] > max_value:
+            max_value = values[i]
+    return min_value, max_value
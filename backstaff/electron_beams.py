@@ -105,6 +105,7 @@ class ElectronBeamSwarm(field_lines.FieldLineSet3):
         params={},
         derived_quantities=[],
         verbose=False,
+        memmap=True,
     ):
         import backstaff.reading as reading
 
@@ -125,6 +126,7 @@ class ElectronBeamSwarm(field_lines.FieldLineSet3):
                 reading.read_electron_beam_swarm_from_custom_binary_file(
                     file_path,
                     acceleration_data_type=acceleration_data_type,
+                    memmap=memmap,
                     params=params,
                     derived_quantities=derived_quantities,
                     verbose=verbose,
@@ -247,13 +249,15 @@ class ElectronBeamSwarm(field_lines.FieldLineSet3):
             self._obtain_mean_electron_speeds()
 
         if "acceleration_height" in derived_quantities:
-            self.fixed_scalar_values["acceleration_height"] = np.asfarray(
-                [-z[0] for z in self.get_varying_scalar_values("z")]
+            z_values = self.get_varying_scalar_values("z")
+            self.fixed_scalar_values["acceleration_height"] = np.fromiter(
+                (-z[0] for z in z_values), dtype=np.float64, count=len(z_values)
             )
 
         if "depletion_height" in derived_quantities:
-            self.fixed_scalar_values["depletion_height"] = np.asfarray(
-                [-z[-1] for z in self.get_varying_scalar_values("z")]
+            z_values = self.get_varying_scalar_values("z")
+            self.fixed_scalar_values["depletion_height"] = np.fromiter(
+                (-z[-1] for z in z_values), dtype=np.float64, count=len(z_values)
             )
 
         if "acceleration_site_electron_density" in derived_quantities:
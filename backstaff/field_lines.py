@@ -1,14 +1,20 @@
+import functools
 import numpy as np
+from collections import OrderedDict
 import scipy.ndimage as ndimage
 import scipy.interpolate as interpolate
+import scipy.spatial as spatial
 from pathlib import Path
+from numba import njit, prange
 
 try:
     import backstaff.units as units
     import backstaff.plotting as plotting
+    import backstaff.array_utils as array_utils
 except ModuleNotFoundError:
     import units
     import plotting
+    import array_utils
 
 
 class FieldLineSet3:
@@ -43,8 +49,19 @@ class FieldLineSet3:
         "F_beam": lambda f: f * (units.U_L * units.U_E / units.U_T),
     }
 
+    # Above this number of points, 3D scatter plots bypass ax.scatter
+    SCATTER_COLLECTION_MIN_POINTS = 100000
+
+    # Precision of the cached path coordinates used for drawing field lines
+    PATH_COORDINATE_DTYPE = np.float32
+
+    # Number of RGBA color arrays kept around for repeated 3D value plots
+    COLOR_CACHE_SIZE = 8
+
     @staticmethod
-    def from_file(file_path, params={}, derived_quantities=[], verbose=False):
+    def from_file(
+        file_path, params={}, derived_quantities=[], verbose=False, memmap=True
+    ):
         import backstaff.reading as reading
 
         file_path = Path(file_path)
@@ -59,6 +76,7 @@ class FieldLineSet3:
         elif extension == ".fl":
             field_line_set = reading.read_3d_field_line_set_from_custom_binary_file(
                 file_path,
+                memmap=memmap,
                 params=params,
                 derived_quantities=derived_quantities,
                 verbose=verbose,
@@ -101,6 +119,11 @@ class FieldLineSet3:
         self.varying_scalar_values = varying_scalar_values
         self.varying_vector_values = varying_vector_values
         self.params = params
+        self._path_coordinates_cache = {}
+        self._segments_cache = {}
+        self._concatenated_values_cache = {}
+        self._converted_values_cache = {}
+        self._color_cache = OrderedDict()
         self._derive_quantities(derived_quantities)
         self.verbose = bool(verbose)
 
@@ -240,7 +263,7 @@ class FieldLineSet3:
         included_points_finder=None,
         result_if_empty=np.nan,
     ):
-        values, weights = self.get_scalar_values(
+        values, weights = self._get_shared_scalar_values(
             value_name,
             value_name_weights,
             included_field_lines_finder=included_field_lines_finder,
@@ -284,20 +307,61 @@ class FieldLineSet3:
         relative_alpha=True,
     ):
         suffix = "0" if self.has_fixed_scalar_values(value_name) else ""
-        values, x, y, z = self.get_scalar_values(
+        values, x, y, z = self._get_shared_scalar_values(
             value_name,
             *[dim + suffix for dim in ["x", "y", "z"]],
             included_field_lines_finder=included_field_lines_finder,
             included_points_finder=included_points_finder,
         )
 
-        values = self._convert_values(value_name, values, do_conversion)
+        convert_values, convert_x, convert_y, convert_z = (
+            self._get_converter(name, do_conversion)
+            for name in (value_name, "x", "y", "z")
+        )
+
+        color_cache_key = (
+            (
+                value_name,
+                do_conversion,
+                log,
+                vmin,
+                vmax,
+                symlog,
+                linthresh,
+                linscale,
+                cmap_name,
+                cmap_bad_color,
+                alpha,
+                relative_alpha,
+            )
+            if included_field_lines_finder is None and included_points_finder is None
+            else None
+        )
+        try:
+            cached = (
+                None
+                if color_cache_key is None
+                else self._color_cache.get(color_cache_key)
+            )
+        except TypeError:
+            color_cache_key = None
+            cached = None
+
+        if cached is not None and cached[0] is values:
+            self._color_cache.move_to_end(color_cache_key)
+            vmin, vmax, c = cached[1:]
+        else:
+            converted_values = convert_values(values)
 
-        if vmin is None:
-            vmin = np.nanmin(values)
-        if vmax is None:
-            vmax = np.nanmax(values)
+            if vmin is None or vmax is None:
+                min_value, max_value = array_utils.nanminmax(converted_values)
+                vmin = min_value if vmin is None else vmin
+                vmax = max_value if vmax is None else vmax
 
+            c = None
+
+        # The normalizer and colormap are returned to the caller, so they are
+        # created anew for every call and only the colors are cached
         if symlog:
             norm = plotting.get_symlog_normalizer(
                 vmin, vmax, linthresh, linscale=linscale
@@ -305,28 +369,48 @@ class FieldLineSet3:
         else:
             norm = plotting.get_normalizer(vmin, vmax, log=log)
 
-        c = plotting.colors_from_values(
-            values,
-            norm,
-            plotting.get_cmap(cmap_name, bad_color=cmap_bad_color),
-            alpha=alpha,
-            relative_alpha=relative_alpha,
-        )
+        cmap = plotting.get_cmap(cmap_name, bad_color=cmap_bad_color)
 
-        ax.scatter(
-            self._convert_values("x", x, do_conversion),
-            self._convert_values("y", y, do_conversion),
-            self._convert_values("z", z, do_conversion),
-            c=c,
-            s=s,
-            marker=marker,
-            edgecolors=edgecolors,
-            depthshade=depthshade,
-        )
+        if c is None:
+            c = plotting.colors_from_values(
+                converted_values,
+                norm,
+                cmap,
+                alpha=alpha,
+                relative_alpha=relative_alpha,
+            )
 
-        return plotting.get_normalizer(vmin, vmax, log=log), plotting.get_cmap(
-            cmap_name
-        )
+            if color_cache_key is not None:
+                c.setflags(write=False)
+                self._color_cache[color_cache_key] = (values, vmin, vmax, c)
+                if len(self._color_cache) > self.COLOR_CACHE_SIZE:
+                    self._color_cache.popitem(last=False)
+
+        if len(c) > self.SCATTER_COLLECTION_MIN_POINTS:
+            plotting.add_3d_scatter_collection(
+                ax,
+                convert_x(x),
+                convert_y(y),
+                convert_z(z),
+                c,
+                s=s,
+                marker=marker,
+                edgecolors=edgecolors,
+                depthshade=depthshade,
+            )
+        else:
+            ax.scatter(
+                convert_x(x),
+                convert_y(y),
+                convert_z(z),
+                c=c,
+                s=s,
+                marker=marker,
+                edgecolors=edgecolors,
+                depthshade=depthshade,
+            )
+
+        return norm, cmap
 
     def add_to_3d_plot_with_single_color(
         self,
@@ -344,7 +428,7 @@ class FieldLineSet3:
         alpha=1.0,
     ):
         if scatter:
-            x, y, z = self.get_scalar_values(
+            x, y, z = self._get_shared_scalar_values(
                 "x",
                 "y",
                 "z",
@@ -363,22 +447,20 @@ class FieldLineSet3:
                 alpha=alpha,
             )
         else:
-            paths_x = self.get_varying_scalar_values("x")
-            paths_y = self.get_varying_scalar_values("y")
-            paths_z = self.get_varying_scalar_values("z")
-            get_c = (lambda i: c[i]) if not isinstance(c, str) else (lambda i: c)
-            for field_line_idx in range(self.get_number_of_field_lines()):
-                for x, y, z in zip(
-                    *self.__find_nonwrapping_segments(
-                        paths_x[field_line_idx],
-                        paths_y[field_line_idx],
-                        paths_z[field_line_idx],
-                    )
-                ):
-                    x = self._convert_values("x", x, do_conversion)
-                    y = self._convert_values("y", y, do_conversion)
-                    z = self._convert_values("z", z, do_conversion)
-                    ax.plot(x, y, z, c=get_c(field_line_idx), lw=lw, alpha=alpha)
+            segments, segment_field_line_indices = self.__find_nonwrapping_segments(
+                do_conversion
+            )
+            plotting.add_3d_polyline_collection(
+                ax,
+                segments,
+                (
+                    c
+                    if isinstance(c, str)
+                    else [c[idx] for idx in segment_field_line_indices]
+                ),
+                lw=lw,
+                alpha=alpha,
+            )
 
     def add_values_as_2d_property_plot(
         self,
@@ -403,22 +485,16 @@ class FieldLineSet3:
             )
             print("Loaded {}".format(save_path))
         else:
-            values_x, values_y, values_color = self.get_scalar_values(
+            values_x, values_y, values_color = self._get_converted_scalar_values(
                 value_name_x,
                 value_name_y,
                 value_name_color,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
                 varying_points_processor=varying_points_processor,
             )
 
-            values_x = self._convert_values(value_name_x, values_x, do_conversion)
-            values_y = self._convert_values(value_name_y, values_y, do_conversion)
-            if values_color is not None:
-                values_color = self._convert_values(
-                    value_name_color, values_color, do_conversion
-                )
-
         if mode == "save":
             if values_color is None:
                 np.savez_compressed(save_path, values_x=values_x, values_y=values_y)
@@ -450,19 +526,14 @@ class FieldLineSet3:
         if mode == "load":
             values, weights = (None, None)
         else:
-            values, weights = self.get_scalar_values(
+            values, weights = self._get_converted_scalar_values(
                 value_name,
                 value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            values = self._convert_values(value_name, values, do_conversion)
-            if weights is not None:
-                weights = self._convert_values(
-                    value_name_weights, weights, do_conversion
-                )
-
         return self.__add_values_as_line_histogram(
             ax, values, weights, mode=mode, **kwargs
         )
@@ -489,36 +560,22 @@ class FieldLineSet3:
             left_value_name, right_value_name = value_names
             left_value_name_weights, right_value_name_weights = value_names_weights
 
-            left_values, left_weights = self.get_scalar_values(
+            left_values, left_weights = self._get_converted_scalar_values(
                 left_value_name,
                 left_value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            right_values, right_weights = self.get_scalar_values(
+            right_values, right_weights = self._get_converted_scalar_values(
                 right_value_name,
                 right_value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            left_values = self._convert_values(
-                left_value_name, left_values, do_conversion
-            )
-            if left_weights is not None:
-                left_weights = self._convert_values(
-                    left_value_name_weights, left_weights, do_conversion
-                )
-
-            right_values = self._convert_values(
-                right_value_name, right_values, do_conversion
-            )
-            if right_weights is not None:
-                right_weights = self._convert_values(
-                    right_value_name_weights, right_weights, do_conversion
-                )
-
         return self.__add_values_as_line_histogram_difference(
             ax,
             (left_values, right_values),
@@ -543,22 +600,16 @@ class FieldLineSet3:
         if mode == "load":
             values_x, values_y, weights = (None, None, None)
         else:
-            values_x, values_y, weights = self.get_scalar_values(
+            values_x, values_y, weights = self._get_converted_scalar_values(
                 value_name_x,
                 value_name_y,
                 value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
-
-            values_x = self._convert_values(value_name_x, values_x, do_conversion)
-            values_y = self._convert_values(value_name_y, values_y, do_conversion)
-            if weights is not None:
-                weights = self._convert_values(
-                    value_name_weights, weights, do_conversion
-                )
-                if weight_scale is not None:
-                    weights *= weight_scale
+            if weights is not None and weight_scale is not None:
+                weights = weights * weight_scale
 
         return self.__add_values_as_2d_histogram_image(
             ax, values_x, values_y, weights, mode=mode, **kwargs
@@ -575,19 +626,15 @@ class FieldLineSet3:
         included_points_finder=None,
         **kwargs,
     ):
-        values_x, values_y, weights = self.get_scalar_values(
+        values_x, values_y, weights = self._get_converted_scalar_values(
             value_name_x,
             value_name_y,
             value_name_weights,
+            do_conversion=do_conversion,
             included_field_lines_finder=included_field_lines_finder,
             included_points_finder=included_points_finder,
         )
 
-        values_x = self._convert_values(value_name_x, values_x, do_conversion)
-        values_y = self._convert_values(value_name_y, values_y, do_conversion)
-        if weights is not None:
-            weights = self._convert_values(value_name_weights, weights, do_conversion)
-
         return self.__add_values_as_2d_histogram_contour(
             ax, values_x, values_y, weights, **kwargs
         )
@@ -619,47 +666,37 @@ class FieldLineSet3:
             left_value_name_y, right_value_name_y = value_names_y
             left_value_name_weights, right_value_name_weights = value_names_weights
 
-            left_values_x, left_values_y, left_weights = self.get_scalar_values(
+            (
+                left_values_x,
+                left_values_y,
+                left_weights,
+            ) = self._get_converted_scalar_values(
                 left_value_name_x,
                 left_value_name_y,
                 left_value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            right_values_x, right_values_y, right_weights = self.get_scalar_values(
+            (
+                right_values_x,
+                right_values_y,
+                right_weights,
+            ) = self._get_converted_scalar_values(
                 right_value_name_x,
                 right_value_name_y,
                 right_value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            left_values_x = self._convert_values(
-                left_value_name_x, left_values_x, do_conversion
-            )
-            left_values_y = self._convert_values(
-                left_value_name_y, left_values_y, do_conversion
-            )
-            if left_weights is not None:
-                left_weights = self._convert_values(
-                    left_value_name_weights, left_weights, do_conversion
-                )
-                if weight_scale is not None:
-                    left_weights *= weight_scale
-
-            right_values_x = self._convert_values(
-                right_value_name_x, right_values_x, do_conversion
-            )
-            right_values_y = self._convert_values(
-                right_value_name_y, right_values_y, do_conversion
-            )
-            if right_weights is not None:
-                right_weights = self._convert_values(
-                    right_value_name_weights, right_weights, do_conversion
-                )
-                if weight_scale is not None:
-                    right_weights *= weight_scale
+            if weight_scale is not None:
+                if left_weights is not None:
+                    left_weights = left_weights * weight_scale
+                if right_weights is not None:
+                    right_weights = right_weights * weight_scale
 
         return self.__add_values_as_2d_histogram_difference_image(
             ax,
@@ -694,47 +731,37 @@ class FieldLineSet3:
                 right_weights,
             ) = (None, None, None, None, None, None)
         else:
-            left_values_x, left_values_y, left_weights = self.get_scalar_values(
+            (
+                left_values_x,
+                left_values_y,
+                left_weights,
+            ) = self._get_converted_scalar_values(
                 value_name_x,
                 value_name_y,
                 value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            right_values_x, right_values_y, right_weights = other.get_scalar_values(
+            (
+                right_values_x,
+                right_values_y,
+                right_weights,
+            ) = other._get_converted_scalar_values(
                 value_name_x,
                 value_name_y,
                 value_name_weights,
+                do_conversion=do_conversion,
                 included_field_lines_finder=included_field_lines_finder,
                 included_points_finder=included_points_finder,
             )
 
-            left_values_x = self._convert_values(
-                value_name_x, left_values_x, do_conversion
-            )
-            left_values_y = self._convert_values(
-                value_name_y, left_values_y, do_conversion
-            )
-            if left_weights is not None:
-                left_weights = self._convert_values(
-                    value_name_weights, left_weights, do_conversion
-                )
-                if weight_scale is not None:
-                    left_weights *= weight_scale
-
-            right_values_x = other._convert_values(
-                value_name_x, right_values_x, do_conversion
-            )
-            right_values_y = other._convert_values(
-                value_name_y, right_values_y, do_conversion
-            )
-            if right_weights is not None:
-                right_weights = other._convert_values(
-                    value_name_weights, right_weights, do_conversion
-                )
-                if weight_scale is not None:
-                    right_weights *= weight_scale
+            if weight_scale is not None:
+                if left_weights is not None:
+                    left_weights = left_weights * weight_scale
+                if right_weights is not None:
+                    right_weights = right_weights * weight_scale
 
         return self.__add_values_as_2d_histogram_difference_image(
             ax,
@@ -780,6 +807,30 @@ class FieldLineSet3:
         included_points_finder=None,
         points_processor=None,
     ):
+        values = self._get_shared_concatenated_varying_scalar_values(
+            value_name,
+            included_field_line_indices=included_field_line_indices,
+            included_points_finder=included_points_finder,
+            points_processor=points_processor,
+        )
+        # Unfiltered values come from a read-only buffer shared with the plotting
+        # methods, so callers get their own copy of it
+        return values if values is None or values.flags.writeable else values.copy()
+
+    def _get_shared_concatenated_varying_scalar_values(
+        self,
+        value_name,
+        included_field_line_indices=None,
+        included_points_finder=None,
+        points_processor=None,
+    ):
+        if (
+            included_field_line_indices is None
+            and included_points_finder is None
+            and points_processor is None
+        ):
+            return self.__get_cached_concatenated_varying_scalar_values(value_name)
+
         if points_processor is not None:
             indices = (
                 range(self.get_number_of_field_lines())
@@ -815,6 +866,23 @@ class FieldLineSet3:
 
         return np.concatenate(values) if len(values) > 0 else None
 
+    def __get_cached_concatenated_varying_scalar_values(self, value_name):
+        source = self.varying_scalar_values[value_name]
+        cached = self._concatenated_values_cache.get(value_name)
+        if cached is None or cached[0] is not source:
+            if hasattr(source, "concatenated"):
+                # Memory-mapped field lines are stored back to back, so the
+                # concatenation is just a view of the underlying buffer
+                values = source.concatenated()
+            else:
+                values = np.concatenate(source) if len(source) > 0 else None
+            if values is not None:
+                # The buffer is shared between callers, so guard against in-place edits
+                values.setflags(write=False)
+            cached = (source, values)
+            self._concatenated_values_cache[value_name] = cached
+        return cached[1]
+
     def get_varying_vector_values(self, value_name):
         return self.varying_vector_values[value_name]
 
@@ -824,6 +892,37 @@ class FieldLineSet3:
         included_field_lines_finder=None,
         included_points_finder=None,
         varying_points_processor=None,
+    ):
+        return self.__get_scalar_values(
+            value_names,
+            self.get_concatenated_varying_scalar_values,
+            included_field_lines_finder=included_field_lines_finder,
+            included_points_finder=included_points_finder,
+            varying_points_processor=varying_points_processor,
+        )
+
+    def _get_shared_scalar_values(
+        self,
+        *value_names,
+        included_field_lines_finder=None,
+        included_points_finder=None,
+        varying_points_processor=None,
+    ):
+        return self.__get_scalar_values(
+            value_names,
+            self._get_shared_concatenated_varying_scalar_values,
+            included_field_lines_finder=included_field_lines_finder,
+            included_points_finder=included_points_finder,
+            varying_points_processor=varying_points_processor,
+        )
+
+    def __get_scalar_values(
+        self,
+        value_names,
+        concatenated_varying_scalar_values_getter,
+        included_field_lines_finder=None,
+        included_points_finder=None,
+        varying_points_processor=None,
     ):
         assert len(value_names) > 0 and value_names[0] is not None
 
@@ -845,24 +944,20 @@ class FieldLineSet3:
             assert self.has_varying_scalar_values(
                 value_name
             ), "No values for value name {}".format(value_name)
-            getter = lambda value_name, included_field_line_indices, included_points_finder: self.get_concatenated_varying_scalar_values(
-                value_name,
-                included_field_line_indices,
-                included_points_finder,
+            getter = functools.partial(
+                concatenated_varying_scalar_values_getter,
                 points_processor=varying_points_processor,
             )
 
         return tuple(
-            [
-                (
-                    None
-                    if value_name is None
-                    else getter(
-                        value_name, included_field_line_indices, included_points_finder
-                    )
+            (
+                None
+                if value_name is None
+                else getter(
+                    value_name, included_field_line_indices, included_points_finder
                 )
-                for value_name in value_names
-            ]
+            )
+            for value_name in value_names
         )
 
     def has_param(self, param_name):
@@ -872,32 +967,62 @@ class FieldLineSet3:
         return self.params[param_name]
 
     def process_value_description(self, value_name, value_description):
-        if value_description is None:
-            if value_name in self.VALUE_DESCRIPTIONS:
-                return self.VALUE_DESCRIPTIONS[value_name]
-            else:
-                return value_name
-        else:
-            return value_description
+        return (
+            self.VALUE_DESCRIPTIONS.get(value_name, value_name)
+            if value_description is None
+            else value_description
+        )
+
+    def _get_converter(self, value_name, do_conversion=True):
+        converter = (
+            self.VALUE_UNIT_CONVERTERS.get(value_name) if do_conversion else None
+        )
+        return (lambda values: values) if converter is None else converter
 
     def _convert_values(self, value_name, values, do_conversion=True):
-        if do_conversion and value_name in self.VALUE_UNIT_CONVERTERS:
-            return self.VALUE_UNIT_CONVERTERS[value_name](values)
-        else:
-            return values
+        return self._get_converter(value_name, do_conversion)(values)
+
+    def _get_converted_scalar_values(self, *value_names, do_conversion=True, **kwargs):
+        return tuple(
+            (
+                None
+                if values is None
+                else self.__get_cached_converted_values(
+                    value_name, values, do_conversion
+                )
+            )
+            for value_name, values in zip(
+                value_names, self._get_shared_scalar_values(*value_names, **kwargs)
+            )
+        )
+
+    def __get_cached_converted_values(self, value_name, values, do_conversion):
+        key = (value_name, do_conversion)
+        cached = self._converted_values_cache.get(key)
+        if cached is None or cached[0] is not values:
+            converted_values = self._convert_values(value_name, values, do_conversion)
+            if converted_values is not values:
+                converted_values.setflags(write=False)
+            cached = (values, converted_values)
+            self._converted_values_cache[key] = cached
+        return cached[1]
 
     def _derive_quantities(self, derived_quantities):
-        for value_name in filter(
-            lambda name: name[-1] == "0"
-            and self.has_varying_scalar_values(name[:-1])
-            and not self.has_fixed_scalar_values(name[:-1]),
-            derived_quantities,
-        ):
-            self.fixed_scalar_values[value_name] = np.asfarray(
-                [
-                    values[0]
-                    for values in self.get_varying_scalar_values(value_name[:-1])
-                ]
+        varying_value_names = self.varying_scalar_values.keys()
+        fixed_value_names = self.fixed_scalar_values.keys()
+        initial_value_names = [
+            name
+            for name in derived_quantities
+            if name.endswith("0")
+            and name[:-1] in varying_value_names
+            and name[:-1] not in fixed_value_names
+        ]
+        for value_name in initial_value_names:
+            varying_values = self.get_varying_scalar_values(value_name[:-1])
+            self.fixed_scalar_values[value_name] = np.fromiter(
+                (values[0] for values in varying_values),
+                dtype=np.float64,
+                count=len(varying_values),
             )
 
         if "s" in derived_quantities:
@@ -1004,20 +1129,48 @@ class FieldLineSet3:
                 )
             ]
 
-    def __find_nonwrapping_segments(self, path_x, path_y, path_z, threshold=3.0):
-        step_lengths = np.sqrt(
-            np.diff(path_x) ** 2 + np.diff(path_y) ** 2 + np.diff(path_z) ** 2
-        )
-        wrap_indices = np.where(step_lengths > threshold * np.mean(step_lengths))[0]
-        if wrap_indices.size > 0:
-            wrap_indices += 1
-            return (
-                np.split(path_x, wrap_indices),
-                np.split(path_y, wrap_indices),
-                np.split(path_z, wrap_indices),
+    def __get_path_coordinates(self, do_conversion):
+        sources = tuple(self.varying_scalar_values[dim] for dim in ("x", "y", "z"))
+        cached = self._path_coordinates_cache.get(do_conversion)
+        if cached is None or any(
+            source is not cached_source
+            for source, cached_source in zip(sources, cached[0])
+        ):
+            convert_x, convert_y, convert_z = (
+                self._get_converter(dim, do_conversion) for dim in ("x", "y", "z")
             )
-        else:
-            return [path_x], [path_y], [path_z]
+            x_values = self.get_varying_scalar_values("x")
+            offsets = np.zeros(len(x_values) + 1, dtype=np.int64)
+            np.cumsum([len(x) for x in x_values], out=offsets[1:])
+            points = np.empty((offsets[-1], 3), dtype=self.PATH_COORDINATE_DTYPE)
+            for start, end, x, y, z in zip(
+                offsets[:-1],
+                offsets[1:],
+                x_values,
+                self.get_varying_scalar_values("y"),
+                self.get_varying_scalar_values("z"),
+            ):
+                points[start:end, 0] = convert_x(x)
+                points[start:end, 1] = convert_y(y)
+                points[start:end, 2] = convert_z(z)
+            cached = (sources, points, offsets)
+            self._path_coordinates_cache[do_conversion] = cached
+        return cached[1:]
+
+    def __find_nonwrapping_segments(self, do_conversion, threshold=3.0):
+        points, offsets = self.__get_path_coordinates(do_conversion)
+        key = (do_conversion, threshold)
+        cached = self._segments_cache.get(key)
+        if cached is None or cached[0] is not points:
+            segment_starts, segment_field_line_indices = _find_segment_starts(
+                points, offsets, float(threshold)
+            )
+            segments = (
+                np.split(points, segment_starts[1:]) if segment_starts.size > 0 else []
+            )
+            cached = (points, segments, segment_field_line_indices)
+            self._segments_cache[key] = cached
+        return cached[1:]
 
     def __add_values_as_2d_property_plot(
         self,
@@ -1066,10 +1219,10 @@ class FieldLineSet3:
                 norm = None
                 cmap = None
             else:
-                if vmin is None:
-                    vmin = np.nanmin(values_color)
-                if vmax is None:
-                    vmax = np.nanmax(values_color)
+                if vmin is None or vmax is None:
+                    min_value, max_value = array_utils.nanminmax(values_color)
+                    vmin = min_value if vmin is None else vmin
+                    vmax = max_value if vmax is None else vmax
 
                 if symlog:
                     norm = plotting.get_symlog_normalizer(
@@ -1080,9 +1233,19 @@ class FieldLineSet3:
 
                 cmap = plotting.get_cmap(cmap_name, bad_color=cmap_bad_color)
 
-                c = plotting.colors_from_values(
-                    values_color, norm, cmap, alpha=alpha, relative_alpha=relative_alpha
-                )
+                if vmin == vmax:
+                    # Nothing to normalize, so give every point the middle color
+                    c = np.tile(cmap(0.5), (len(values_color), 1))
+                    c[:, -1] = alpha
+                    c[np.isnan(values_color)] = cmap(np.nan)
+                else:
+                    c = plotting.colors_from_values(
+                        values_color,
+                        norm,
+                        cmap,
+                        alpha=alpha,
+                        relative_alpha=relative_alpha,
+                    )
 
             ax.scatter(
                 values_x,
@@ -1270,7 +1433,7 @@ class FieldLineSet3:
         vmax=None,
         cmap_name="viridis",
         cmap_bad_color="w",
-        rasterized=None,
+        rasterized=True,
         mode="instant",
         save_path=None,
     ):
@@ -1316,8 +1479,28 @@ class FieldLineSet3:
             else:
                 norm = plotting.get_normalizer(vmin, vmax, log=log)
 
+            if plotting.has_uniform_bins(bin_edges_x, bin_edges_y):
+                return ax.imshow(
+                    hist.T,
+                    extent=(
+                        bin_edges_x[0],
+                        bin_edges_x[-1],
+                        bin_edges_y[0],
+                        bin_edges_y[-1],
+                    ),
+                    origin="lower",
+                    interpolation="nearest",
+                    aspect="auto",
+                    norm=norm,
+                    vmin=vmin,
+                    vmax=vmax,
+                    cmap=plotting.get_cmap(cmap_name, bad_color=cmap_bad_color),
+                    rasterized=rasterized,
+                )
+
             return ax.pcolormesh(
-                *np.meshgrid(bin_edges_x, bin_edges_y),
+                bin_edges_x,
+                bin_edges_y,
                 hist.T,
                 norm=norm,
                 vmin=vmin,
@@ -1385,7 +1568,8 @@ class FieldLineSet3:
         contour_func = ax.contourf if filled else ax.contour
 
         cs = contour_func(
-            *np.meshgrid(bin_centers_x, bin_centers_y),
+            bin_centers_x,
+            bin_centers_y,
             hist.T,
             levels=levels,
             colors=colors,
@@ -1430,7 +1614,7 @@ class FieldLineSet3:
         vmax=None,
         cmap_name="viridis",
         cmap_bad_color="w",
-        rasterized=None,
+        rasterized=True,
         mode="instant",
         save_path=None,
     ):
@@ -1482,8 +1666,26 @@ class FieldLineSet3:
             else:
                 norm = plotting.get_linear_normalizer(vmin, vmax)
 
+            if plotting.has_uniform_bins(bin_edges_x, bin_edges_y):
+                return ax.imshow(
+                    hist_diff.T,
+                    extent=(
+                        bin_edges_x[0],
+                        bin_edges_x[-1],
+                        bin_edges_y[0],
+                        bin_edges_y[-1],
+                    ),
+                    origin="lower",
+                    interpolation="nearest",
+                    aspect="auto",
+                    norm=norm,
+                    cmap=plotting.get_cmap(cmap_name, bad_color=cmap_bad_color),
+                    rasterized=rasterized,
+                )
+
             return ax.pcolormesh(
-                *np.meshgrid(bin_edges_x, bin_edges_y),
+                bin_edges_x,
+                bin_edges_y,
                 hist_diff.T,
                 norm=norm,
                 cmap=plotting.get_cmap(cmap_name, bad_color=cmap_bad_color),
@@ -1491,6 +1693,47 @@ class FieldLineSet3:
             )
 
 
+@njit(cache=True)
+def _find_segment_starts(points, offsets, threshold):
+    n_field_lines = offsets.size - 1
+    max_n_segments = points.shape[0] + n_field_lines
+    segment_starts = np.empty(max_n_segments, dtype=np.int64)
+    segment_field_line_indices = np.empty(max_n_segments, dtype=np.int64)
+    n_segments = 0
+
+    for field_line_idx in range(n_field_lines):
+        start = offsets[field_line_idx]
+        end = offsets[field_line_idx + 1]
+
+        segment_starts[n_segments] = start
+        segment_field_line_indices[n_segments] = field_line_idx
+        n_segments += 1
+
+        n_steps = end - start - 1
+        if n_steps < 1:
+            continue
+
+        mean_step_length = 0.0
+        for i in range(start, end - 1):
+            dx = points[i + 1, 0] - points[i, 0]
+            dy = points[i + 1, 1] - points[i, 1]
+            dz = points[i + 1, 2] - points[i, 2]
+            mean_step_length += np.sqrt(dx * dx + dy * dy + dz * dz)
+        mean_step_length /= n_steps
+
+        max_squared_step_length = (threshold * mean_step_length) ** 2
+        for i in range(start, end - 1):
+            dx = points[i + 1, 0] - points[i, 0]
+            dy = points[i + 1, 1] - points[i, 1]
+            dz = points[i + 1, 2] - points[i, 2]
+            if dx * dx + dy * dy + dz * dz > max_squared_step_length:
+                segment_starts[n_segments] = i + 1
+                segment_field_line_indices[n_segments] = field_line_idx
+                n_segments += 1
+
+    return segment_starts[:n_segments], segment_field_line_indices[:n_segments]
+
+
 def find_field_lines_with_propagation_senses(propagation_senses, fixed_scalar_values):
     return [
         i
@@ -1507,31 +1750,125 @@ def find_field_lines_with_propagation_sense(propagation_sense, fixed_scalar_valu
     ]
 
 
+class FlatFieldLineCoordinates:
+    # Precision of the flattened coordinates scanned by near-point searches
+    COORDINATE_DTYPE = np.float32
+
+    def __init__(self, varying_scalar_values):
+        self.sources = tuple(varying_scalar_values[dim] for dim in ("x", "y", "z"))
+        x_values = self.sources[0]
+        lengths = np.fromiter(
+            (len(x) for x in x_values), dtype=np.int64, count=len(x_values)
+        )
+        self.offsets = np.zeros(lengths.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.points = np.empty((self.offsets[-1], 3), dtype=self.COORDINATE_DTYPE)
+        for dim, values in enumerate(self.sources):
+            if self.offsets[-1] > 0:
+                self.points[:, dim] = (
+                    values.concatenated()
+                    if hasattr(values, "concatenated")
+                    else np.concatenate(values)
+                )
+        self.field_line_indices = np.repeat(
+            np.arange(lengths.size, dtype=np.int32), lengths
+        )
+        self._tree = None
+        self._bounding_boxes = None
+
+    def is_for(self, varying_scalar_values):
+        return all(
+            varying_scalar_values[dim] is source
+            for dim, source in zip(("x", "y", "z"), self.sources)
+        )
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = spatial.cKDTree(self.points, leafsize=32)
+        return self._tree
+
+    @property
+    def bounding_boxes(self):
+        if self._bounding_boxes is None:
+            nonempty_field_line_indices = np.flatnonzero(np.diff(self.offsets) > 0)
+            starts = self.offsets[nonempty_field_line_indices]
+            self._bounding_boxes = (
+                nonempty_field_line_indices,
+                np.minimum.reduceat(self.points, starts, axis=0),
+                np.maximum.reduceat(self.points, starts, axis=0),
+            )
+        return self._bounding_boxes
+
+    def find_field_lines_near_point(self, point, max_distance):
+        if self.points.shape[0] == 0:
+            return np.empty(0, dtype=self.field_line_indices.dtype)
+        point_indices = self.tree.query_ball_point(np.asarray(point), max_distance)
+        return np.unique(self.field_line_indices[point_indices])
+
+    def scan_field_lines_near_point(self, point, max_distance):
+        if self.points.shape[0] == 0:
+            return np.empty(0, dtype=self.field_line_indices.dtype)
+        point = np.ascontiguousarray(point, dtype=np.float64)
+        max_squared_distance = float(max_distance) ** 2
+
+        # Only field lines whose bounding box comes within max_distance of the
+        # point can have a point that does
+        field_line_indices, lower_corners, upper_corners = self.bounding_boxes
+        box_squared_distances = np.sum(
+            (np.clip(point, lower_corners, upper_corners) - point) ** 2, axis=1
+        )
+        candidate_field_line_indices = field_line_indices[
+            box_squared_distances <= max_squared_distance * (1.0 + 1e-9)
+        ]
+
+        return _find_field_lines_with_points_within_distance(
+            self.points,
+            self.offsets,
+            candidate_field_line_indices,
+            point,
+            max_squared_distance,
+        )
+
+
+@njit(parallel=True, cache=True)
+def _find_field_lines_with_points_within_distance(
+    points, offsets, candidate_field_line_indices, point, max_squared_distance
+):
+    hits = np.zeros(candidate_field_line_indices.size, dtype=np.bool_)
+    for i in prange(candidate_field_line_indices.size):
+        field_line_idx = candidate_field_line_indices[i]
+        for idx in range(offsets[field_line_idx], offsets[field_line_idx + 1]):
+            dx = np.float64(points[idx, 0]) - point[0]
+            dy = np.float64(points[idx, 1]) - point[1]
+            dz = np.float64(points[idx, 2]) - point[2]
+            if dx * dx + dy * dy + dz * dz <= max_squared_distance:
+                hits[i] = True
+                break
+    return candidate_field_line_indices[hits]
+
+
 def find_field_lines_passing_near_point(
     point,
     max_distance,
     initial_position_bounds,
     fixed_scalar_values,
     varying_scalar_values,
+    use_kdtree=False,
+    coordinates=None,
 ):
     x_lims, y_lims, z_lims = initial_position_bounds
+    # Callers querying the same field lines repeatedly can pass their own
+    # FlatFieldLineCoordinates to avoid flattening the coordinates every time
+    if coordinates is None or not coordinates.is_for(varying_scalar_values):
+        coordinates = FlatFieldLineCoordinates(varying_scalar_values)
+    near_field_line_indices = (
+        coordinates.find_field_lines_near_point(point, max_distance)
+        if use_kdtree
+        else coordinates.scan_field_lines_near_point(point, max_distance)
+    )
     return list(
-        set(
-            [
-                i
-                for i, (x, y, z) in enumerate(
-                    zip(
-                        varying_scalar_values["x"],
-                        varying_scalar_values["y"],
-                        varying_scalar_values["z"],
-                    )
-                )
-                if np.any(
-                    (x - point[0]) ** 2 + (y - point[1]) ** 2 + (z - point[2]) ** 2
-                    <= max_distance**2
-                )
-            ]
-        ).intersection(
+        set(near_field_line_indices.tolist()).intersection(
             [
                 i
                 for i, (x, y, z) in enumerate(
@@ -1737,6 +2074,13 @@ def resample_varying_points(
         return varying_scalar_values[value_name][field_line_idx]
 
 
+def _split_kwargs(kwargs, **defaults):
+    remaining_kwargs = dict(kwargs)
+    return [
+        remaining_kwargs.pop(key, default) for key, default in defaults.items()
+    ], remaining_kwargs
+
+
 def plot_field_lines(
     field_line_set,
     value_name=None,
@@ -2161,13 +2505,18 @@ def plot_field_line_value_2d_histogram(
         return
 
     if contour_kwargs:
-        contour_field_line_set = contour_kwargs.pop("dataset", field_line_set)
-        contour_value_name_x = contour_kwargs.pop("value_name_x", value_name_x)
-        contour_value_name_y = contour_kwargs.pop("value_name_y", value_name_y)
-        contour_kwargs["log_x"] = contour_kwargs.pop("log_x", log_x)
-        contour_kwargs["log_y"] = contour_kwargs.pop("log_y", log_y)
+        (
+            contour_field_line_set,
+            contour_value_name_x,
+            contour_value_name_y,
+        ), remaining_contour_kwargs = _split_kwargs(
+            {"log_x": log_x, "log_y": log_y, **contour_kwargs},
+            dataset=field_line_set,
+            value_name_x=value_name_x,
+            value_name_y=value_name_y,
+        )
         contour_field_line_set.add_values_as_2d_histogram_contour(
-            ax, contour_value_name_x, contour_value_name_y, **contour_kwargs
+            ax, contour_value_name_x, contour_value_name_y, **remaining_contour_kwargs
         )
 
     if extra_artists is not None:
@@ -2276,13 +2625,18 @@ def plot_field_line_value_2d_histogram_difference(
         return
 
     if contour_kwargs:
-        contour_field_line_set = contour_kwargs.pop("dataset", field_line_set)
-        contour_value_name_x = contour_kwargs.pop("value_name_x", value_names_x[0])
-        contour_value_name_y = contour_kwargs.pop("value_name_y", value_names_y[0])
-        contour_kwargs["log_x"] = contour_kwargs.pop("log_x", log_x)
-        contour_kwargs["log_y"] = contour_kwargs.pop("log_y", log_y)
+        (
+            contour_field_line_set,
+            contour_value_name_x,
+            contour_value_name_y,
+        ), remaining_contour_kwargs = _split_kwargs(
+            {"log_x": log_x, "log_y": log_y, **contour_kwargs},
+            dataset=field_line_set,
+            value_name_x=value_names_x[0],
+            value_name_y=value_names_y[0],
+        )
         contour_field_line_set.add_values_as_2d_histogram_contour(
-            ax, contour_value_name_x, contour_value_name_y, **contour_kwargs
+            ax, contour_value_name_x, contour_value_name_y, **remaining_contour_kwargs
         )
 
     if extra_artists is not None:
@@ -2450,9 +2804,32 @@ def plot_field_line_value_2d_histogram_difference_between_sets(
 
 
 def plot_field_line_value_2d_histogram_comparison(
-    field_line_set, value_names_x, value_names_y, value_names_weights, **kwargs
+    field_line_set,
+    value_names_x,
+    value_names_y,
+    value_names_weights,
+    render=True,
+    output_path=None,
+    mode="instant",
+    **kwargs,
 ):
-    fig, axes = plotting.create_2d_subplots(ncols=2, figsize=(8, 4))
+    if mode == "save":
+        fig, axes = None, (None, None)
+    else:
+        fig, axes = plotting.create_2d_subplots(
+            ncols=2, figsize=(8, 4), constrained_layout=False
+        )
+
+    included_field_lines_finder = kwargs.get("included_field_lines_finder")
+    if included_field_lines_finder is not None and mode != "load":
+        # Both panels show the same field lines, so only find them once. Loaded
+        # histograms are not recomputed, so the finder is not needed then.
+        included_field_line_indices = included_field_lines_finder(
+            field_line_set.fixed_scalar_values, field_line_set.varying_scalar_values
+        )
+        kwargs["included_field_lines_finder"] = (
+            lambda _fixed_scalar_values, _varying_scalar_values: included_field_line_indices
+        )
 
     plot_field_line_value_2d_histogram(
         field_line_set,
@@ -2462,6 +2839,8 @@ def plot_field_line_value_2d_histogram_comparison(
         fig=fig,
         ax=axes[0],
         render=False,
+        output_path=output_path,
+        mode=mode,
         **kwargs,
     )
 
@@ -2472,5 +2851,15 @@ def plot_field_line_value_2d_histogram_comparison(
         value_name_weights=value_names_weights[1],
         fig=fig,
         ax=axes[1],
+        render=False,
+        output_path=output_path,
+        mode=mode,
         **kwargs,
     )
+
+    if mode == "save":
+        return
+
+    # Both panels are drawn before the single layout pass in render
+    if render:
+        plotting.render(fig, output_path=output_path)
@@ -1,15 +1,44 @@
+import os
+import sys
 import copy
+import functools
 import numpy as np
-# import matplotlib as mpl
-# mpl.use("agg")
+import matplotlib as mpl
+from numba import njit, prange, get_num_threads
+
+
+def _backend_is_unresolved():
+    if "matplotlib.pyplot" in sys.modules:
+        return False
+    try:
+        return mpl.get_backend(auto_select=False) is None
+    except TypeError:
+        # Matplotlib < 3.10 leaves a sentinel in rcParams until a backend is resolved
+        return dict.__getitem__(mpl.rcParams, "backend") is getattr(
+            mpl.rcsetup, "_auto_backend_sentinel", None
+        )
+
+
+# Without a display, select Agg directly instead of having pyplot probe GUI
+# backends, unless a backend has already been chosen
+if (
+    _backend_is_unresolved()
+    and sys.platform.startswith("linux")
+    and not os.environ.get("DISPLAY")
+    and not os.environ.get("WAYLAND_DISPLAY")
+):
+    mpl.use("agg")
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpl_patches
 import matplotlib.colors as mpl_colors
+import matplotlib.collections as mpl_collections
+import matplotlib.markers as mpl_markers
+import matplotlib.transforms as mpl_transforms
 import matplotlib.cm as mpl_cm
 import matplotlib.animation as animation
 import matplotlib.patheffects as path_effects
 from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection, patch_collection_2d_to_3d
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 from matplotlib.offsetbox import AnchoredText
@@ -125,6 +154,21 @@ def get_normalizer(vmin, vmax, clip=False, log=False):
 
 
 def get_cmap(name, bad_color="w"):
+    try:
+        cmap = _get_cached_cmap(name, bad_color)
+    except TypeError:  # Unhashable color specification
+        cmap = _create_cmap(name, bad_color)
+    return copy.copy(cmap)
+
+
+@functools.lru_cache(maxsize=64)
+def _get_cached_cmap(name, bad_color):
+    cmap = _create_cmap(name, bad_color)
+    cmap(0.0)  # Build the lookup table once so that copies inherit it
+    return cmap
+
+
+def _create_cmap(name, bad_color):
     cmap = copy.copy(
         CUSTOM_COLORMAPS[name] if name in CUSTOM_COLORMAPS else plt.get_cmap(name)
     )
@@ -310,6 +354,52 @@ def add_3d_line_collection(ax, x, y, z, colors, lw=1.0):
     return ax.add_collection(lc)
 
 
+def add_3d_polyline_collection(ax, polylines, colors, lw=1.0, alpha=1.0):
+    lc = Line3DCollection(polylines, colors=colors, alpha=alpha)
+    lc.set_linewidth(lw)
+    return ax.add_collection3d(lc)
+
+
+def add_3d_scatter_collection(
+    ax,
+    x,
+    y,
+    z,
+    colors,
+    s=1.0,
+    marker="o",
+    edgecolors="none",
+    linewidths=None,
+    depthshade=False,
+):
+    had_data = ax.has_data()
+    marker = mpl_markers.MarkerStyle(marker)
+    # Draw markers that cannot be filled with their face color, like Axes.scatter
+    if not marker.is_filled():
+        if marker.get_fillstyle() == "none":
+            edgecolors, colors = colors, "none"
+        else:
+            edgecolors = "face"
+        if linewidths is None:
+            linewidths = mpl.rcParams["lines.linewidth"]
+    pc = mpl_collections.PathCollection(
+        (marker.get_path().transformed(marker.get_transform()),),
+        sizes=np.ravel(s),
+        offsets=np.column_stack((x, y)),
+        offset_transform=ax.transData,
+        facecolors=colors,
+        edgecolors=edgecolors,
+        linewidths=linewidths,
+    )
+    pc.set_transform(mpl_transforms.IdentityTransform())
+    patch_collection_2d_to_3d(pc, zs=np.array(z), zdir="z", depthshade=depthshade)
+    ax.add_collection(pc)
+    # Match the z-margin that Axes3D.scatter applies
+    ax.set_zmargin(max(ax.get_zmargin(), 0.05))
+    ax.auto_scale_xyz(x, y, z, had_data)
+    return pc
+
+
 def add_textbox(ax, text, loc, pad=0.4):
     textbox = AnchoredText(text, loc, pad=pad)
     ax.add_artist(textbox)
@@ -1208,6 +1298,13 @@ def plot_scatter_with_histograms(
     return fig, ax, ax_hist_x, ax_hist_y
 
 
+def has_uniform_bins(*bin_edges):
+    return all(
+        np.allclose(np.diff(edges), edges[1] - edges[0], rtol=1e-5, atol=0)
+        for edges in bin_edges
+    )
+
+
 def compute_coord_lims(coords, log=False, pad=0.05):
     coords = coords[coords > 0] if log else coords
     lower = np.nanmin(coords)
@@ -1831,26 +1928,142 @@ def compute_2d_histogram(
         min_value_y = np.log10(min_value_y)
         max_value_y = np.log10(max_value_y)
 
-    hist, bin_edges_x, bin_edges_y = np.histogram2d(
+    hist, bin_edges_x, bin_edges_y = _parallel_histogram2d(
         values_x,
         values_y,
-        bins=[bins_x, bins_y],
-        range=[[min_value_x, max_value_x], [min_value_y, max_value_y]],
-        weights=weights,
+        weights,
+        [bins_x, bins_y],
+        [[min_value_x, max_value_x], [min_value_y, max_value_y]],
     )
 
     if weights is not None and weighted_average:
-        unweighted_hist, _, _ = np.histogram2d(
+        unweighted_hist, _, _ = _parallel_histogram2d(
             values_x,
             values_y,
-            bins=[bin_edges_x, bin_edges_y],
-            range=[[min_value_x, max_value_x], [min_value_y, max_value_y]],
+            None,
+            [bins_x, bins_y],
+            [[min_value_x, max_value_x], [min_value_y, max_value_y]],
         )
         hist /= unweighted_hist
 
     return hist, bin_edges_x, bin_edges_y
 
 
+def _parallel_histogram2d(
+    values_x, values_y, weights, bins, bin_range, n_threads=None, min_chunk_size=1000000
+):
+    if all(isinstance(b, (int, np.integer)) for b in bins) and all(
+        lower < upper for lower, upper in bin_range
+    ):
+        return _uniform_histogram2d(
+            values_x,
+            values_y,
+            weights,
+            bins,
+            bin_range,
+            n_threads=n_threads,
+            min_chunk_size=min_chunk_size,
+        )
+    return np.histogram2d(
+        values_x, values_y, bins=bins, range=bin_range, weights=weights
+    )
+
+
+def _uniform_histogram2d(
+    values_x,
+    values_y,
+    weights,
+    bins,
+    bin_range,
+    n_threads=None,
+    min_chunk_size=1000000,
+    max_chunk_hists_bytes=64 * 1024**2,
+):
+    (bins_x, bins_y), ((min_x, max_x), (min_y, max_y)) = bins, bin_range
+    bin_edges_x = np.linspace(min_x, max_x, bins_x + 1)
+    bin_edges_y = np.linspace(min_y, max_y, bins_y + 1)
+
+    # Every chunk gets its own histogram, so limit how many of them are live
+    # at once when the bins are many
+    n_threads = get_num_threads() if n_threads is None else n_threads
+    n_chunks = max(
+        1,
+        min(
+            n_threads,
+            len(values_x) // min_chunk_size,
+            max_chunk_hists_bytes // (bins_x * bins_y * 8),
+        ),
+    )
+
+    # Pass read-only contiguous float64 views so that the kernel is only ever
+    # compiled for one signature
+    hist = _compute_uniform_histogram2d(
+        _as_kernel_array(values_x),
+        _as_kernel_array(values_y),
+        _as_kernel_array(np.empty(0) if weights is None else weights),
+        _as_kernel_array(bin_edges_x),
+        _as_kernel_array(bin_edges_y),
+        int(n_chunks),
+    )
+    return hist, bin_edges_x, bin_edges_y
+
+
+def _as_kernel_array(values):
+    values = np.ascontiguousarray(values, dtype=np.float64).view()
+    values.setflags(write=False)
+    return values
+
+
+@njit(parallel=True, cache=True)
+def _compute_uniform_histogram2d(
+    values_x, values_y, weights, bin_edges_x, bin_edges_y, n_chunks
+):
+    n_values = values_x.size
+    chunk_size = (n_values + n_chunks - 1) // n_chunks
+    bins_x = bin_edges_x.size - 1
+    bins_y = bin_edges_y.size - 1
+
+    # Each chunk fills its own histogram so that no two threads write to the same bin
+    chunk_hists = np.zeros((n_chunks, bins_x, bins_y))
+    for chunk_idx in prange(n_chunks):
+        for i in range(
+            chunk_idx * chunk_size, min(n_values, (chunk_idx + 1) * chunk_size)
+        ):
+            idx_x = _find_uniform_bin_index(values_x[i], bin_edges_x)
+            if idx_x < 0:
+                continue
+            idx_y = _find_uniform_bin_index(values_y[i], bin_edges_y)
+            if idx_y < 0:
+                continue
+            chunk_hists[chunk_idx, idx_x, idx_y] += (
+                1.0 if weights.size == 0 else weights[i]
+            )
+
+    hist = chunk_hists[0].copy()
+    for chunk_idx in range(1, n_chunks):
+        hist += chunk_hists[chunk_idx]
+    return hist
+
+
+@njit(cache=True)
+def _find_uniform_bin_index(value, bin_edges):
+    n_bins = bin_edges.size - 1
+    if not (value >= bin_edges[0] and value <= bin_edges[-1]):
+        return -1
+
+    idx = min(
+        int((value - bin_edges[0]) * (n_bins / (bin_edges[-1] - bin_edges[0]))),
+        n_bins - 1,
+    )
+
+    # Correct for round-off so that the result matches searching the bin edges
+    if value < bin_edges[idx]:
+        idx -= 1
+    elif idx != n_bins - 1 and value >= bin_edges[idx + 1]:
+        idx += 1
+    return idx
+
+
 def compute_2d_histogram_difference(
     values_x,
     values_y,
@@ -104,6 +104,9 @@ class _SplittedArray1D:
     def __len__(self):
         return self.n_parts
 
+    def concatenated(self):
+        return self.buffer[self.split_indices[0] :] if self.n_parts > 0 else None
+
     def __getitem__(self, idx):
         return self.buffer[self._create_slice(idx)]
 
@@ -184,7 +187,7 @@ def __parse_custom_field_line_binary_file_memmap(f):
     def running_memmap(f, dtype, shape):
         byte_offset = f.tell()
         m = np.memmap(f, dtype=dtype, mode="r", offset=byte_offset, shape=shape)
-        mapped_bytes = np.product(shape, dtype=int) * dtype.itemsize
+        mapped_bytes = np.prod(shape, dtype=int) * dtype.itemsize
         f.seek(byte_offset + mapped_bytes)
         return m
 
@@ -347,7 +350,7 @@ def __parse_custom_field_line_binary_file_load_all(f):
         fixed_scalar_values = np.fromfile(
             f,
             dtype=float_dtype,
-            count=np.product(fixed_scalar_values_shape, dtype=int),
+            count=np.prod(fixed_scalar_values_shape, dtype=int),
             sep="",
         ).reshape(fixed_scalar_values_shape)
 
@@ -360,7 +363,7 @@ def __parse_custom_field_line_binary_file_load_all(f):
         fixed_vector_values = np.fromfile(
             f,
             dtype=float_dtype,
-            count=np.product(fixed_vector_values_shape, dtype=int),
+            count=np.prod(fixed_vector_values_shape, dtype=int),
             sep="",
         ).reshape(fixed_vector_values_shape)
 
@@ -372,7 +375,7 @@ def __parse_custom_field_line_binary_file_load_all(f):
         varying_scalar_values = np.fromfile(
             f,
             dtype=float_dtype,
-            count=np.product(varying_scalar_values_shape, dtype=int),
+            count=np.prod(varying_scalar_values_shape, dtype=int),
             sep="",
         ).reshape(varying_scalar_values_shape)
 
@@ -385,7 +388,7 @@ def __parse_custom_field_line_binary_file_load_all(f):
         varying_vector_values = np.fromfile(
             f,
             dtype=float_dtype,
-            count=np.product(varying_vector_values_shape, dtype=int),
+            count=np.prod(varying_vector_values_shape, dtype=int),
             sep="",
         ).reshape(varying_vector_values_shape)
 